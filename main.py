@@ -1,10 +1,18 @@
+import asyncio
 import json
+import re
 import time
 import sys
 import httpx
+import orjson
 import uvicorn
-from fastapi import FastAPI, Request, Response
-from fastapi.responses import StreamingResponse
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
 from loguru import logger
 from dotenv import load_dotenv
 import os
@@ -60,28 +68,109 @@ ZENMUX_WEB_SEARCH_TOOL = {
 # 文档：https://zenmux.ai/docs/guide/advanced/web-search.html  
   
 # ================= 日志配置 =================  
+
+# 是否输出逐请求的详细日志（入站/出站地址、出站请求头），环境变量 VERBOSE=1 开启
+VERBOSE = os.getenv("VERBOSE", "").strip() == "1"
+
 logger.remove()  
 logger.add(  
     sys.stderr,  
     format="<green>{time:HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{message}</cyan>",  
-    level="INFO"  
+    level="INFO",
+    enqueue=True  # 交给后台线程写出，避免阻塞事件循环
 )  
   
-app = FastAPI()  
+# 全局复用的上游连接池（在 lifespan 中创建/关闭）
+CLIENT: httpx.AsyncClient | None = None
+
+@asynccontextmanager
+async def lifespan(app):
+    global CLIENT
+    CLIENT = httpx.AsyncClient(
+        proxy=PROXY_URL,
+        timeout=httpx.Timeout(None, connect=30.0),
+        limits=httpx.Limits(max_connections=200, max_keepalive_connections=100),
+        http2=True,  # 并发的流式请求可复用同一条上游连接
+    )
+    try:
+        yield
+    finally:
+        await CLIENT.aclose()
   
 # ================= 辅助函数 =================
+
+# 由上游地址派生的常量，避免每个请求重复拼接
+CHAT_URL = f"{TARGET_BASE_URL}/chat/completions"
+MSG_URL = f"{ANTHROPIC_BASE_URL}/messages"
+TARGET_HAS_V1 = TARGET_BASE_URL.endswith("/v1")
+TARGET_ROOT = TARGET_BASE_URL.rstrip("/") + "/"
+
+# 注入的 Web Search 工具类型，用于判断请求中是否已存在
+WS_TYPE = (ZENMUX_WEB_SEARCH_TOOL or {}).get("type")
+
+SPINNER = "⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏"
+
+# 转发时需要剔除的请求头 / 响应头（小写字节串，直接匹配原始头部）
+REQ_HOP_HEADERS = frozenset((b"host", b"content-length", b"connection", b"accept-encoding"))
+RESP_HOP_HEADERS = frozenset((b"content-encoding", b"content-length", b"transfer-encoding", b"connection"))
+
+# 配置了 API_KEY 时覆盖到每个出站请求上的认证头
+AUTH_HEADERS = {"authorization": f"Bearer {API_KEY}", "x-api-key": API_KEY} if API_KEY else {}
+
+# SSE 响应头（预先编码，直接用于 ASGI 消息）
+SSE_HEADERS = [
+    (b"content-type", b"text/event-stream"),
+    (b"cache-control", b"no-cache"),
+    (b"x-accel-buffering", b"no"),
+]
+
+# 通用转发中小于该大小的响应直接整体读取，其余流式透传
+SMALL_BODY_LIMIT = 64 * 1024
+
+# 直接在原始请求体上匹配的关键字段，免去完整解析
+MODEL_RE = re.compile(rb'"model"\s*:\s*"([^"]+)"')  # 仅用于日志
+STREAM_TRUE_RE = re.compile(rb'"stream"\s*:\s*true')
+STREAM_OPTIONS_RE = re.compile(rb'"stream_options"')
   
-def get_clean_headers(request: Request):
+def get_clean_headers(raw_headers: list[tuple[bytes, bytes]]):
     """清理并构造请求头"""
+    # ASGI 规定原始请求头名已是小写字节串，无需再 lower()
     headers = {
-        k: v for k, v in request.headers.items()
-        if k.lower() not in ("host", "content-length", "connection", "accept-encoding")
+        k.decode("latin-1"): v.decode("latin-1") for k, v in raw_headers
+        if k not in REQ_HOP_HEADERS
     }
-    if API_KEY:
-        headers["authorization"] = f"Bearer {API_KEY}"
-        headers["x-api-key"] = API_KEY
+    if AUTH_HEADERS:
+        headers.update(AUTH_HEADERS)
     return headers
 
+def get_clean_response_headers(response: httpx.Response):
+    """清理上游响应头，返回可直接追加到 raw_headers 的 (bytes, bytes) 列表
+
+    保留重复出现的头（如多个 set-cookie）
+    """
+    # httpx 的原始响应头保留了上游的大小写，ASGI 要求小写
+    return [
+        (name, v) for k, v in response.headers.raw
+        if (name := k.lower()) not in RESP_HOP_HEADERS
+    ]
+
+# 是否已记录过上游实际协商到的 HTTP 版本
+HTTP_VERSION_LOGGED = False
+
+def log_http_version(response: httpx.Response):
+    """首个上游响应到达时记录实际协商到的 HTTP 版本（如经代理退回 HTTP/1.1）"""
+    global HTTP_VERSION_LOGGED
+    if not HTTP_VERSION_LOGGED:
+        HTTP_VERSION_LOGGED = True
+        logger.info(f"🔌 上游协议: {response.http_version}")
+
+def iter_upstream(response: httpx.Response):
+    """上游响应体迭代器：未压缩时直接透传原始字节，省去解码开销"""
+    # httpx 会自带 accept-encoding，上游仍可能压缩，此时需解码
+    if "content-encoding" in response.headers:
+        return response.aiter_bytes()
+    return response.aiter_raw()
+
 def redact_headers(headers: dict):
     """用于日志的请求头脱敏"""
     redacted = {}
@@ -92,18 +181,56 @@ def redact_headers(headers: dict):
             redacted[k] = v
     return redacted
   
+def loads_body(raw: bytes):
+    """解析 JSON 请求体；orjson 不接受的输入（孤立代理项、NaN 等）退回标准库 json
+
+    返回 (body, 是否使用了标准库解析)
+    """
+    try:
+        return orjson.loads(raw), False
+    except orjson.JSONDecodeError:
+        pass
+    try:
+        return json.loads(raw), True
+    except RecursionError as e:
+        # 嵌套过深时标准库抛出 RecursionError，统一按解析失败处理
+        raise ValueError("JSON 嵌套层级过深") from e
+
+def dumps_body(body, stdlib: bool = False) -> bytes:
+    """序列化 JSON 请求体
+
+    解析时用了标准库则同样用标准库序列化，避免 orjson 把 NaN 等改写为 null；
+    orjson 无法编码时（如孤立代理项）也退回标准库 json
+    """
+    if not stdlib:
+        try:
+            return orjson.dumps(body)
+        except (orjson.JSONEncodeError, TypeError):
+            pass
+    return json.dumps(body).encode()
+
+@lru_cache(maxsize=128)
+def anthropic_model_error(model):
+    """未匹配模型的错误响应体，按模型名缓存序列化结果"""
+    return orjson.dumps({"error": f"Model '{model}' not found in ANTHROPIC_MODEL_MAP"})
+
 def modify_anthropic_body(body: dict):  
-    """修改 Anthropic 请求体：模型映射 + 注入 web_search"""  
+    """修改 Anthropic 请求体：模型映射 + 注入 web_search
+
+    返回 (body, 模型未匹配时的错误响应体, 请求体是否被修改)
+    """
     if not isinstance(body, dict):  
-        return body, None  
+        return body, None, False
   
     model = body.get("model")  
-    if model not in ANTHROPIC_MODEL_MAP:  
-        return body, model  # 返回未匹配的模型名  
+    mapped = ANTHROPIC_MODEL_MAP.get(model)
+    if mapped is None:
+        return body, anthropic_model_error(model) if model else None, False
   
-    body["model"] = ANTHROPIC_MODEL_MAP[model]  
+    changed = model != mapped
+    body["model"] = mapped
     logger.opt(colors=True).info(  
-        f"🔁 <yellow>模型名替换</yellow>: {model} -> {body['model']}"  
+        f"🔁 <yellow>模型名替换</yellow>: {model} -> {mapped}"  
     )  
   
     if ENABLE_WEB_SEARCH and ZENMUX_WEB_SEARCH_TOOL:  
@@ -111,133 +238,197 @@ def modify_anthropic_body(body: dict):
         if not isinstance(tools, list):  
             tools = []  
   
-        existing_types = {t.get("type") for t in tools if isinstance(t, dict)}  
-        if ZENMUX_WEB_SEARCH_TOOL.get("type") not in existing_types:  
+        if not any(isinstance(t, dict) and t.get("type") == WS_TYPE for t in tools):
             tools.append(ZENMUX_WEB_SEARCH_TOOL)  
             body["tools"] = tools  
+            changed = True
             logger.opt(colors=True).info("🔍 <cyan>已注入 ZenMux Web Search 工具</cyan>")  
   
-    return body, None  
+    return body, None, changed
   
 async def stream_generator(response, start_time, model_name=None, is_chat=False):  
     """通用的流式响应生成器"""  
+    chunk_count = 0  
+    total_bytes = 0  
+
+    last_ui_sec = 0
+    last_ui_str = ""
+
+    def draw_ui():
+        nonlocal last_ui_sec, last_ui_str
+        # 时间字符串按秒缓存，同一秒内的刷新不再格式化
+        now = time.time()
+        sec = int(now)
+        if sec != last_ui_sec:
+            last_ui_sec = sec
+            last_ui_str = time.strftime("%H:%M:%S", time.localtime(now))
+        sys.stderr.write(
+            f"\r\033[K⚡ [活跃] {SPINNER[chunk_count % 10]} {model_name} | 块数: {chunk_count} | {total_bytes >> 10}KB | {last_ui_str}"
+        )
+        sys.stderr.flush()
+
+    async def ui_loop():
+        # 终端状态行由后台任务定时刷新，逐块转发路径上不做任何格式化
+        while True:
+            draw_ui()
+            await asyncio.sleep(0.25)
+
+    ui_task = asyncio.create_task(ui_loop()) if is_chat else None
+
+    def stop_ui():
+        nonlocal ui_task
+        if ui_task is not None:
+            ui_task.cancel()
+            ui_task = None
+            sys.stderr.write("\n")
+
     try:  
-        chunk_count = 0  
-        total_bytes = 0  
-  
-        async for chunk in response.aiter_bytes():  
-            chunk_count += 1  
-            total_bytes += len(chunk)  
-            yield chunk  
-  
-            if is_chat:  
-                now_str = time.strftime("%H:%M:%S")  
-                spinner = "⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏"[chunk_count % 10]  
-                sys.stderr.write(  
-                    f"\r\033[K⚡ [活跃] {spinner} {model_name} | 块数: {chunk_count} | {total_bytes/1024:.1f}KB | {now_str}"  
-                )  
-                sys.stderr.flush()  
-  
+        async for chunk in iter_upstream(response):
+            chunk_count += 1
+            total_bytes += len(chunk)
+            yield chunk
+
         if is_chat:  
-            sys.stderr.write("\n")  
+            draw_ui()
+            stop_ui()
             total_duration = (time.time() - start_time) * 1000  
             logger.success(f"✅ 传输完成: {model_name} | chunks: {chunk_count} | 总耗时: {total_duration:.0f}ms")  
   
     except Exception as e:  
-        if is_chat:  
-            sys.stderr.write("\n")  
+        stop_ui()
         logger.error(f"❌ 流传输中断 | 类型: {type(e).__name__} | 详情: {repr(e)}")  
         yield str(e).encode()  
+    finally:
+        # 终端写入失败也必须归还上游连接
+        try:
+            stop_ui()
+        finally:
+            await response.aclose()
+  
+async def sse_send(send, receive, status, gen, closer):
+    """直接通过 ASGI 消息输出 SSE 流，客户端断开时立即停止读取上游"""
+    async def pump():
+        await send({"type": "http.response.start", "status": status, "headers": SSE_HEADERS})
+        async for chunk in gen:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def wait_disconnect():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    pump_task = asyncio.create_task(pump())
+    disconnect_task = asyncio.create_task(wait_disconnect())
+    try:
+        done, _ = await asyncio.wait((pump_task, disconnect_task), return_when=asyncio.FIRST_COMPLETED)
+        if pump_task in done:
+            pump_task.result()
+    finally:
+        pump_task.cancel()
+        disconnect_task.cancel()
+        await asyncio.gather(pump_task, disconnect_task, return_exceptions=True)
+        await closer()
+
+def sse_response(response: httpx.Response, gen):
+    """包装成可由路由直接返回的 ASGI 应用"""
+    async def closer():
+        # 生成器未启动时 aclose 不会执行其 finally，需单独关闭上游响应（可重复调用）
+        try:
+            await gen.aclose()
+        finally:
+            await response.aclose()
+
+    async def asgi(scope, receive, send):
+        await sse_send(send, receive, response.status_code, gen, closer)
+    return asgi
   
 # ================= OpenAI Chat =================  
   
-@app.post("/v1/chat/completions")  
-@app.post("/chat/completions")  
 async def handle_chat_completions(request: Request):  
     start_time = time.time()  
-    headers = get_clean_headers(request)  
-  
-    try:  
-        body = await request.json()  
-    except:  
-        body = {}  
+    headers = get_clean_headers(request.headers.raw)
   
-    model = body.get("model", "unknown")  
-    logger.info(f"➡️ [IN]  {request.url.path}")  
+    raw = await request.body()
+    payload = raw
+
+    match = MODEL_RE.search(raw)
+    model = match.group(1).decode(errors="replace") if match else "unknown"
+    if VERBOSE:
+        logger.info(f"➡️ [IN]  {request.url.path}")  
     logger.info(f"🚀 [Chat] 发起请求 -> {model}")  
   
-    if body.get("stream") is True and "stream_options" not in body:  
-        body["stream_options"] = {"include_usage": True}  
-        logger.opt(colors=True).info(f"💉 <yellow>已注入 usage 补丁</yellow>")  
-  
-    target_url = f"{TARGET_BASE_URL}/chat/completions"  
-    logger.info(f"⬅️ [OUT] {target_url}")  
-  
-    client = httpx.AsyncClient(proxy=PROXY_URL, timeout=None)  
+    # 只有可能需要注入 usage 补丁时才完整解析请求体，其余情况原样透传
+    if STREAM_TRUE_RE.search(raw) and not STREAM_OPTIONS_RE.search(raw):
+        try:
+            body, stdlib = loads_body(raw)
+        except ValueError as e:
+            logger.warning(f"⚠️ [Chat] 请求体解析失败，未注入 usage 补丁: {e}")
+            body, stdlib = {}, False
+        if isinstance(body, dict) and body.get("stream") is True:
+            body["stream_options"] = {"include_usage": True}
+            payload = dumps_body(body, stdlib)
+            logger.opt(colors=True).info(f"💉 <yellow>已注入 usage 补丁</yellow>")  
+  
+    target_url = CHAT_URL
+    if VERBOSE:
+        logger.info(f"⬅️ [OUT] {target_url}")  
   
     try:  
-        req = client.build_request("POST", target_url, json=body, headers=headers)  
-        r = await client.send(req, stream=True)  
+        headers["content-type"] = "application/json"
+        req = CLIENT.build_request("POST", target_url, content=payload, headers=headers)  
+        r = await CLIENT.send(req, stream=True)
+        log_http_version(r)
     except Exception as e:  
-        await client.aclose()  
         logger.error(f"❌ 连接建立失败: {e}")  
         return Response(content=f"Connection Error: {e}", status_code=502)  
   
-    return StreamingResponse(  
-        stream_generator(r, start_time, model, is_chat=True),  
-        status_code=r.status_code,  
-        media_type="text/event-stream",  
-        background=client.aclose  
-    )  
+    return sse_response(r, stream_generator(r, start_time, model, is_chat=True))
   
 # ================= Anthropic Messages =================  
   
-@app.post("/v1/messages")  
-@app.post("/messages")  
 async def handle_anthropic_messages(request: Request):  
     start_time = time.time()  
-    headers = get_clean_headers(request)  
+    headers = get_clean_headers(request.headers.raw)
   
+    raw = await request.body()
     try:  
-        body = await request.json()  
-    except:  
-        body = {}  
-  
-    body, unmatched_model = modify_anthropic_body(body)  
-    if unmatched_model:  
-        logger.error(f"❌ Anthropic 模型未匹配: {unmatched_model}")  
+        body, stdlib = loads_body(raw) if raw else ({}, False)
+    except ValueError as e:
+        logger.warning(f"⚠️ [Anthropic] 请求体解析失败，原样转发: {e}")
+        body, stdlib = {}, False
+  
+    body, error_body, changed = modify_anthropic_body(body)  
+    if error_body:  
+        logger.error(f"❌ Anthropic 模型未匹配: {body.get('model')}")  
         return Response(  
-            content=json.dumps({  
-                "error": f"Model '{unmatched_model}' not found in ANTHROPIC_MODEL_MAP"  
-            }),  
+            content=error_body,
             status_code=400,  
             media_type="application/json"  
         )  
   
     model = body.get("model", "unknown")
-    logger.info(f"➡️ [IN]  {request.url.path}")
+    if VERBOSE:
+        logger.info(f"➡️ [IN]  {request.url.path}")
     logger.info(f"🟣 [Anthropic] 发起请求 -> {model}")
    
-    target_url = f"{ANTHROPIC_BASE_URL}/messages"
-    logger.info(f"⬅️ [OUT] {target_url}")
-    logger.info(f"🧾 [Anthropic] 出站请求头: {redact_headers(headers)}")
+    target_url = MSG_URL
+    if VERBOSE:
+        logger.info(f"⬅️ [OUT] {target_url}")
+        logger.info(f"🧾 [Anthropic] 出站请求头: {redact_headers(headers)}")
    
-    client = httpx.AsyncClient(proxy=PROXY_URL, timeout=None)
-  
     try:  
-        req = client.build_request("POST", target_url, json=body, headers=headers)  
+        headers["content-type"] = "application/json"
+        payload = dumps_body(body, stdlib) if changed else raw
+        req = CLIENT.build_request("POST", target_url, content=payload, headers=headers)  
   
         if body.get("stream") is True:
-            r = await client.send(req, stream=True)
+            r = await CLIENT.send(req, stream=True)
+            log_http_version(r)
             logger.info(f"🧪 [Anthropic] 上游状态码: {r.status_code}")
-            return StreamingResponse(
-                stream_generator(r, start_time, model, is_chat=True),
-                status_code=r.status_code,
-                media_type="text/event-stream",
-                background=client.aclose
-            )
+            return sse_response(r, stream_generator(r, start_time, model, is_chat=True))
         else:
-            r = await client.send(req)
+            r = await CLIENT.send(req)
+            log_http_version(r)
             content = await r.aread()
             logger.info(f"🧪 [Anthropic] 上游状态码: {r.status_code}")
             if r.status_code >= 400:
@@ -246,80 +437,111 @@ async def handle_anthropic_messages(request: Request):
                 except Exception as log_err:
                     logger.error(f"🧨 [Anthropic] 上游错误响应读取失败: {log_err}")
    
-            excluded_headers = {"content-encoding", "content-length", "transfer-encoding", "connection"}
-            resp_headers = {k: v for k, v in r.headers.items() if k.lower() not in excluded_headers}
+            resp_headers = get_clean_response_headers(r)
    
-            await client.aclose()
-            return Response(content=content, status_code=r.status_code, headers=resp_headers)
+            response = Response(content=content, status_code=r.status_code)
+            response.raw_headers.extend(resp_headers)
+            return response
   
     except Exception as e:  
-        await client.aclose()  
         logger.error(f"❌ Anthropic 代理失败: {e}")  
         return Response(content=f"Anthropic Proxy Error: {e}", status_code=502)  
   
 # ================= 通用转发 =================  
   
-@app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "HEAD"])  
-async def proxy_all(request: Request, path: str):  
+async def proxy_all(request: Request):  
     start_time = time.time()  
+    path = request.path_params["path"]
     method = request.method  
   
-    clean_path = path  
-    if TARGET_BASE_URL.endswith("/v1") and path.startswith("v1/"):  
-        clean_path = path[3:]  
-    elif path.startswith("/"):  
-        clean_path = path[1:]  
-    target_url = f"{TARGET_BASE_URL}/{clean_path}"  
+    clean_path = path.removeprefix("/")
+    if TARGET_HAS_V1:
+        clean_path = clean_path.removeprefix("v1/")
+    target_url = TARGET_ROOT + clean_path
   
     params = dict(request.query_params)  
-    try:  
-        req_body = await request.body()  
-    except:  
-        req_body = None  
-  
-    req_headers = {  
-        k: v for k, v in request.headers.items()  
-        if k.lower() not in ("host", "content-length", "connection", "accept-encoding")  
-    }  
-    if API_KEY:  
-        req_headers["authorization"] = f"Bearer {API_KEY}"  
-  
-    logger.info(f"➡️ [IN]  {request.url.path}")  
-    logger.info(f"🔄 [Proxy] {method} {clean_path} -> 转发中...")  
-    logger.info(f"⬅️ [OUT] {target_url}")  
   
-    client = httpx.AsyncClient(proxy=PROXY_URL, timeout=None)  
+    raw_headers = request.headers.raw
+    req_headers = get_clean_headers(raw_headers)
+
+    # 客户端声明了请求体时（不限方法）边收边转发，不在本地缓冲
+    content_length = ""
+    chunked = False
+    for k, v in raw_headers:
+        if k == b"content-length":
+            content_length = v.decode("latin-1").strip()
+        elif k == b"transfer-encoding":
+            chunked = True
+
+    req_body = None
+    if chunked or (content_length.isdigit() and int(content_length) > 0):
+        req_body = request.stream()
+        # 原样透传时客户端的 content-length 仍然有效，保留以免上游改走 chunked
+        if content_length:
+            req_headers["content-length"] = content_length
+  
+    if VERBOSE:
+        logger.info(f"➡️ [IN]  {request.url.path}")  
+    logger.info(f"🔄 [Proxy] {method} {clean_path} -> 转发中...")  
+    if VERBOSE:
+        logger.info(f"⬅️ [OUT] {target_url}")  
   
     try:  
-        resp = await client.request(  
-            method=method,  
-            url=target_url,  
-            headers=req_headers,  
-            params=params,  
-            content=req_body  
-        )  
-  
-        excluded_headers = {"content-encoding", "content-length", "transfer-encoding", "connection"}  
-        resp_headers = {k: v for k, v in resp.headers.items() if k.lower() not in excluded_headers}  
+        req = CLIENT.build_request(method, target_url, headers=req_headers, params=params, content=req_body)
+        resp = await CLIENT.send(req, stream=True)
+        log_http_version(resp)
+
+        resp_headers = get_clean_response_headers(resp)
   
         logger.info(f"⬅️ [Proxy] 响应: {resp.status_code} (耗时: {(time.time()-start_time)*1000:.0f}ms)")  
   
-        content = await resp.aread()  
-        await client.aclose()  
-  
-        return Response(  
-            content=content,  
-            status_code=resp.status_code,  
-            headers=resp_headers  
-        )  
+        content_length = resp.headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) <= SMALL_BODY_LIMIT:
+            content = await resp.aread()  
+            response = Response(  
+                content=content,  
+                status_code=resp.status_code
+            )  
+        else:
+            response = StreamingResponse(
+                iter_upstream(resp),
+                status_code=resp.status_code,
+                background=BackgroundTask(resp.aclose)
+            )
+        response.raw_headers.extend(resp_headers)
+        return response
   
     except Exception as e:  
-        await client.aclose()  
         logger.error(f"❌ 代理失败: {e}")  
         return Response(content=f"Proxy Error: {e}", status_code=502)  
   
+# ================= 路由 =================
+
+# 直接使用 Starlette 路由，省去 FastAPI 的依赖注入与参数解析开销
+app = Starlette(
+    routes=[
+        Route("/v1/chat/completions", handle_chat_completions, methods=["POST"]),
+        Route("/chat/completions", handle_chat_completions, methods=["POST"]),
+        Route("/v1/messages", handle_anthropic_messages, methods=["POST"]),
+        Route("/messages", handle_anthropic_messages, methods=["POST"]),
+        Route("/{path:path}", proxy_all, methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "HEAD"]),
+    ],
+    lifespan=lifespan,
+)
+
 if __name__ == "__main__":
      logger.info(f"🔥 全能代理已启动: http://0.0.0.0:{LISTEN_PORT}")
      proxy_info = PROXY_URL if PROXY_URL else "未设置"
      logger.info(f"🔗 上游: {TARGET_BASE_URL} | 代理: {proxy_info}")
-     uvicorn.run(app, host="0.0.0.0", port=LISTEN_PORT, log_level="error")
+     uvicorn.run(
+         app,
+         host="0.0.0.0",
+         port=LISTEN_PORT,
+         log_level="error",
+         # uvloop 不支持 Windows，此时退回标准 asyncio 事件循环
+         loop="asyncio" if sys.platform == "win32" else "uvloop",
+         http="httptools",
+         proxy_headers=False,
+         server_header=False,
+         date_header=False
+     )